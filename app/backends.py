@@ -0,0 +1,182 @@
+"""Backends de modelo intercambiables para `GLiNER2Service`.
+
+Un backend recibe el schema `{entidad: definicion}` y devuelve la salida cruda
+de GLiNER2 (`{"entities": {label: [valor, ...]}}`), que el servicio normaliza.
+Dentro de cada etiqueta los valores van de mayor a menor confianza y, como en
+`format_results` de gliner2, solo con la primera aparicion de cada texto (sin
+distinguir mayusculas) salvo que se pida `deduplicate=False`.
+
+- `gliner2`: modelo real de Hugging Face o ruta local.
+- `stub`: salida determinista y latencia configurable, sin cargar pesos; sirve
+  para pruebas de carga de la capa HTTP sin depender del modelo.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+import time
+from pathlib import Path
+from threading import Lock
+from typing import TYPE_CHECKING, Any, Protocol
+
+if TYPE_CHECKING:
+    from gliner2 import GLiNER2
+
+BACKEND_GLINER2 = "gliner2"
+BACKEND_STUB = "stub"
+BACKENDS = (BACKEND_GLINER2, BACKEND_STUB)
+
+
+class ModelBackend(Protocol):
+    def load(self) -> Any: ...
+
+    def extract_entities(
+        self,
+        text: str,
+        schema: dict[str, str],
+        threshold: float,
+        include_confidence: bool,
+        include_spans: bool,
+        deduplicate: bool = True,
+    ) -> dict[str, Any]: ...
+
+
+class GLiNER2Backend:
+    def __init__(self, model_name: str) -> None:
+        self.model_name = model_name
+        self._model: GLiNER2 | None = None
+        self._lock = Lock()
+
+    def load(self) -> GLiNER2:
+        if self._model is not None:
+            return self._model
+
+        with self._lock:
+            if self._model is None:
+                from gliner2 import GLiNER2
+
+                self._model = GLiNER2.from_pretrained(self.model_name)
+
+        return self._model
+
+    def extract_entities(
+        self,
+        text: str,
+        schema: dict[str, str],
+        threshold: float,
+        include_confidence: bool,
+        include_spans: bool,
+        deduplicate: bool = True,
+    ) -> dict[str, Any]:
+        model = self.load()
+        # `Schema.entities` acepta `{nombre: descripcion}`: las definiciones llegan al modelo.
+        result = model.extract_entities(
+            text=text,
+            entity_types=schema,
+            threshold=threshold,
+            format_results=deduplicate,
+            include_confidence=include_confidence,
+            include_spans=include_spans,
+        )
+        if deduplicate:
+            return result
+        # Sin `format_results` gliner2 devuelve `{"entities": [{label: [...]}]}` con
+        # todas las apariciones, ya ordenadas por confianza.
+        raw = result.get("entities") or [{}]
+        return {"entities": {label: values or [] for label, values in raw[0].items()}}
+
+
+class StubBackend:
+    """Backend determinista: mismas entradas, misma salida y misma latencia.
+
+    Si no se fija `output`, cada palabra que empieza por mayuscula se asigna a
+    una etiqueta del schema por turnos, con `confidence` fija y spans reales; los
+    textos repetidos dentro de una etiqueta se descartan como en gliner2.
+    """
+
+    _WORD = re.compile(r"\b[A-ZÁÉÍÓÚÑ][\wÁÉÍÓÚÑáéíóúñ]*")
+
+    def __init__(
+        self,
+        latency_ms: float = 0.0,
+        per_char_us: float = 0.0,
+        confidence: float = 0.9,
+        output: dict[str, Any] | None = None,
+    ) -> None:
+        self.latency_ms = latency_ms
+        self.per_char_us = per_char_us
+        self.confidence = confidence
+        self.output = output
+
+    def load(self) -> StubBackend:
+        return self
+
+    def latency_for(self, text: str) -> float:
+        return self.latency_ms / 1000 + len(text) * self.per_char_us / 1_000_000
+
+    def extract_entities(
+        self,
+        text: str,
+        schema: dict[str, str],
+        threshold: float,
+        include_confidence: bool,
+        include_spans: bool,
+        deduplicate: bool = True,
+    ) -> dict[str, Any]:
+        delay = self.latency_for(text)
+        if delay > 0:
+            time.sleep(delay)
+
+        if self.output is not None:
+            return self.output
+
+        labels = list(schema.keys())
+        by_label: dict[str, list[Any]] = {label: [] for label in labels}
+        if not labels or self.confidence < threshold:
+            return {"entities": by_label}
+
+        seen: dict[str, set[str]] = {label: set() for label in labels}
+        for i, match in enumerate(self._WORD.finditer(text)):
+            label = labels[i % len(labels)]
+            if deduplicate:
+                if match.group().lower() in seen[label]:
+                    continue
+                seen[label].add(match.group().lower())
+            if not include_confidence and not include_spans:
+                by_label[label].append(match.group())
+                continue
+            value: dict[str, Any] = {"text": match.group()}
+            if include_confidence:
+                value["confidence"] = self.confidence
+            if include_spans:
+                value["start"] = match.start()
+                value["end"] = match.end()
+            by_label[label].append(value)
+        return {"entities": by_label}
+
+
+def create_backend(
+    name: str,
+    model_name: str,
+    stub_latency_ms: float = 0.0,
+    stub_per_char_us: float = 0.0,
+    stub_confidence: float = 0.9,
+    stub_output_file: str | None = None,
+) -> ModelBackend:
+    if name == BACKEND_GLINER2:
+        return GLiNER2Backend(model_name=model_name)
+    if name == BACKEND_STUB:
+        output = None
+        if stub_output_file:
+            # Salida cruda fija en formato GLiNER2: {"entities": {label: [...]}}.
+            output = json.loads(Path(stub_output_file).read_text(encoding="utf-8"))
+            if not isinstance(output, dict) or not isinstance(output.get("entities"), dict):
+                raise ValueError(f"Salida de stub invalida en {stub_output_file}: se espera {{\"entities\": {{...}}}}")
+        return StubBackend(
+            latency_ms=stub_latency_ms,
+            per_char_us=stub_per_char_us,
+            confidence=stub_confidence,
+            output=output,
+        )
+    raise ValueError(f"Backend de modelo desconocido: {name} (opciones: {', '.join(BACKENDS)})")
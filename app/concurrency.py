@@ -0,0 +1,54 @@
+"""Control de inferencias simultaneas dentro de un proceso."""
+
+from __future__ import annotations
+
+from collections.abc import Iterator
+from contextlib import contextmanager
+from threading import Condition
+
+
+class InferenceSlots:
+    """Semaforo de `slots` inferencias con un modo exclusivo.
+
+    `shared()` ocupa un slot, como un `BoundedSemaphore`. `exclusive()` espera a
+    que terminen las inferencias en curso y bloquea las nuevas mientras dura;
+    se usa para perfilar una peticion sin que otras ensucien las medidas.
+    """
+
+    def __init__(self, slots: int) -> None:
+        self.slots = slots
+        self._cond = Condition()
+        self._active = 0
+        self._exclusive = False
+        self._exclusive_waiting = 0
+
+    @contextmanager
+    def shared(self) -> Iterator[None]:
+        with self._cond:
+            # Las peticiones exclusivas en espera tienen prioridad para no quedarse sin turno.
+            while self._exclusive or self._exclusive_waiting or self._active >= self.slots:
+                self._cond.wait()
+            self._active += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._active -= 1
+                self._cond.notify_all()
+
+    @contextmanager
+    def exclusive(self) -> Iterator[None]:
+        with self._cond:
+            self._exclusive_waiting += 1
+            try:
+                while self._exclusive or self._active:
+                    self._cond.wait()
+            finally:
+                self._exclusive_waiting -= 1
+            self._exclusive = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._exclusive = False
+                self._cond.notify_all()
@@ -0,0 +1,258 @@
+"""Re-extraccion incremental para documentos que se editan y reenvian.
+
+Cada `document_id` guarda la ultima version del texto partida en segmentos
+(frases o ventanas) y las entidades de cada segmento con offsets relativos.
+Con una nueva version se comparan las listas de segmentos con `difflib`: los
+segmentos iguales reutilizan sus entidades (desplazando offsets) y solo las
+regiones cambiadas pasan por el modelo.
+
+Cada segmento guarda todas las apariciones de sus entidades; el orden por
+confianza y el descarte de textos repetidos que hace gliner2 se aplican al
+final, sobre el documento entero, como en una pasada completa. Con el modelo
+real la confianza de un segmento reprocesado depende solo de su region (no del
+documento entero), asi que puede diferir ligeramente de la pasada completa.
+
+Las sesiones viven en memoria del proceso; con varios workers hace falta que
+el balanceador envie el mismo documento al mismo worker.
+"""
+
+from __future__ import annotations
+
+import difflib
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from threading import Lock
+
+from app.schemas import EntityDefinition, ExtractedEntity
+from app.service import GLiNER2Service
+
+# Fin de frase seguido de espacio, o salto de linea.
+_BOUNDARY = re.compile(r"(?<=[.!?])\s+|\n+")
+MAX_SEGMENT_CHARS = 1000
+
+
+def split_segments(text: str, max_chars: int = MAX_SEGMENT_CHARS) -> list[tuple[int, int]]:
+    """Parte `text` en segmentos contiguos `(start, end)` que lo cubren entero.
+
+    El espacio tras cada frase se queda en su segmento; las frases mas largas
+    que `max_chars` se cortan en ventanas por el ultimo espacio disponible.
+    """
+    bounds: list[tuple[int, int]] = []
+    start = 0
+    for match in _BOUNDARY.finditer(text):
+        if match.end() > start:
+            bounds.append((start, match.end()))
+            start = match.end()
+    if start < len(text):
+        bounds.append((start, len(text)))
+
+    segments: list[tuple[int, int]] = []
+    for seg_start, seg_end in bounds:
+        while seg_end - seg_start > max_chars:
+            cut = text.rfind(" ", seg_start + 1, seg_start + max_chars)
+            cut = seg_start + max_chars if cut == -1 else cut + 1
+            segments.append((seg_start, cut))
+            seg_start = cut
+        segments.append((seg_start, seg_end))
+    return segments
+
+
+@dataclass
+class _DocumentSession:
+    params: tuple
+    segments: list[str]
+    # Todas las apariciones por segmento (sin deduplicar), con confianza y
+    # start/end relativos al inicio del segmento.
+    entities: list[list[ExtractedEntity]]
+
+
+class DocumentSessionStore:
+    def __init__(self, service: GLiNER2Service, max_sessions: int = 1000) -> None:
+        self.service = service
+        self.max_sessions = max_sessions
+        self._sessions: OrderedDict[str, _DocumentSession] = OrderedDict()
+        self._lock = Lock()
+
+    def _get(self, document_id: str) -> _DocumentSession | None:
+        with self._lock:
+            session = self._sessions.get(document_id)
+            if session is not None:
+                self._sessions.move_to_end(document_id)
+            return session
+
+    def _put(self, document_id: str, session: _DocumentSession) -> None:
+        with self._lock:
+            self._sessions[document_id] = session
+            self._sessions.move_to_end(document_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def discard(self, document_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(document_id, None) is not None
+
+    def _extract_region(
+        self,
+        text: str,
+        bounds: list[tuple[int, int]],
+        entities: list[EntityDefinition],
+        threshold: float,
+        timings: dict[str, float] | None,
+    ) -> list[list[ExtractedEntity]]:
+        """Extrae una region contigua de segmentos y reparte las entidades por segmento."""
+        region_start, region_end = bounds[0][0], bounds[-1][1]
+        found = self.service.extract(
+            text=text[region_start:region_end],
+            entities=entities,
+            threshold=threshold,
+            include_confidence=True,
+            include_spans=True,
+            timings=timings,
+            deduplicate=False,
+        )
+
+        per_segment: list[list[ExtractedEntity]] = [[] for _ in bounds]
+        for entity in found:
+            index = 0
+            if entity.start is not None:
+                absolute = region_start + entity.start
+                while index + 1 < len(bounds) and absolute >= bounds[index + 1][0]:
+                    index += 1
+            offset = bounds[index][0] - region_start
+            per_segment[index].append(
+                entity.model_copy(
+                    update={
+                        "start": None if entity.start is None else entity.start - offset,
+                        "end": None if entity.end is None else entity.end - offset,
+                    }
+                )
+            )
+        return per_segment
+
+    @staticmethod
+    def _crossed_boundaries(session: _DocumentSession) -> list[bool]:
+        """`crossed[k]` es True si alguna entidad cruza el limite entre los segmentos k y k+1."""
+        ends: list[int] = []
+        offset = 0
+        for segment in session.segments:
+            offset += len(segment)
+            ends.append(offset)
+
+        crossed = [False] * len(session.segments)
+        for k, segment_entities in enumerate(session.entities):
+            segment_start = ends[k - 1] if k else 0
+            for entity in segment_entities:
+                if entity.end is None:
+                    continue
+                absolute_end = segment_start + entity.end
+                index = k
+                while index + 1 < len(ends) and absolute_end > ends[index]:
+                    crossed[index] = True
+                    index += 1
+        return crossed
+
+    def _reuse_map(self, previous: _DocumentSession, new_segments: list[str]) -> list[int | None]:
+        """Para cada segmento nuevo, el indice del segmento anterior reutilizable (o None)."""
+        reuse: list[int | None] = [None] * len(new_segments)
+        matcher = difflib.SequenceMatcher(None, previous.segments, new_segments, autojunk=False)
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            if tag == "equal":
+                reuse[j1:j2] = range(i1, i2)
+
+        # Dos segmentos unidos por una entidad que cruza el limite se reutilizan
+        # juntos o se reprocesan juntos; si no, la entidad quedaria obsoleta o duplicada.
+        crossed = self._crossed_boundaries(previous)
+        changed = True
+        while changed:
+            changed = False
+            for j, k in enumerate(reuse):
+                if k is None:
+                    continue
+                next_kept = j + 1 < len(reuse) and reuse[j + 1] == k + 1
+                prev_kept = j > 0 and reuse[j - 1] == k - 1
+                if (crossed[k] and not next_kept) or (k > 0 and crossed[k - 1] and not prev_kept):
+                    reuse[j] = None
+                    changed = True
+        return reuse
+
+    def extract(
+        self,
+        document_id: str,
+        text: str,
+        entities: list[EntityDefinition],
+        threshold: float = 0.5,
+        include_confidence: bool = True,
+        include_spans: bool = True,
+        timings: dict[str, float] | None = None,
+    ) -> list[ExtractedEntity]:
+        # Cambiar el schema o el umbral invalida la cache del documento; la confianza
+        # se guarda siempre porque hace falta para ordenar y deduplicar.
+        params = (
+            tuple((entity.name, entity.definition) for entity in entities),
+            threshold,
+        )
+        bounds = split_segments(text)
+        new_segments = [text[start:end] for start, end in bounds]
+
+        previous = self._get(document_id)
+        if previous is None or previous.params != params:
+            reuse: list[int | None] = [None] * len(new_segments)
+        else:
+            if timings is not None:
+                t0 = time.perf_counter()
+            reuse = self._reuse_map(previous, new_segments)
+            if timings is not None:
+                timings["diff"] = time.perf_counter() - t0
+
+        new_entities: list[list[ExtractedEntity]] = [[] for _ in new_segments]
+        j = 0
+        while j < len(new_segments):
+            k = reuse[j]
+            if k is not None:
+                new_entities[j] = previous.entities[k]  # type: ignore[union-attr]
+                j += 1
+                continue
+            # Region contigua de segmentos a reprocesar.
+            end = j
+            while end < len(new_segments) and reuse[end] is None:
+                end += 1
+            new_entities[j:end] = self._extract_region(
+                text=text,
+                bounds=bounds[j:end],
+                entities=entities,
+                threshold=threshold,
+                timings=timings,
+            )
+            j = end
+
+        self._put(document_id, _DocumentSession(params=params, segments=new_segments, entities=new_entities))
+
+        # Como `format_results` de gliner2 en una pasada completa: agrupado por etiqueta
+        # en el orden del schema, de mayor a menor confianza (empates por posicion) y
+        # solo la primera aparicion de cada texto, sin distinguir mayusculas.
+        by_label: dict[str, list[ExtractedEntity]] = {entity.name: [] for entity in entities}
+        for (seg_start, _), segment_entities in zip(bounds, new_entities):
+            for entity in segment_entities:
+                if entity.start is not None and entity.end is not None:
+                    entity = entity.model_copy(
+                        update={"start": entity.start + seg_start, "end": entity.end + seg_start}
+                    )
+                by_label.setdefault(entity.label, []).append(entity)
+
+        result: list[ExtractedEntity] = []
+        for label_entities in by_label.values():
+            label_entities.sort(key=lambda e: (-(e.score or 0.0), e.start or 0, e.end or 0))
+            seen: set[str] = set()
+            for entity in label_entities:
+                if entity.text.lower() in seen:
+                    continue
+                seen.add(entity.text.lower())
+                update: dict[str, None] = {}
+                if not include_confidence:
+                    update["score"] = None
+                if not include_spans:
+                    update.update(start=None, end=None)
+                result.append(entity.model_copy(update=update) if update else entity)
+        return result
@@ -1,13 +1,37 @@
 from fastapi import FastAPI
 
+from app.backends import create_backend
+from app.concurrency import InferenceSlots
+from app.incremental import DocumentSessionStore
 from app.schemas import ExtractRequest, ExtractResponse
 from app.service import GLiNER2Service
+from config_loader import get_config
 
 APP_TITLE = "GLiNER2 NER API"
 APP_VERSION = "1.0.0"
-MODEL_NAME = "fastino/gliner2-multi-v1"
 
-service = GLiNER2Service(model_name=MODEL_NAME)
+cfg = get_config()
+
+# `torch_threads` e `inference_slots` como en run_api.py; el numero de procesos
+# se fija al lanzar uvicorn (`uvicorn app.main:app --workers N`).
+if cfg.torch_threads is not None:
+    import torch
+
+    torch.set_num_threads(cfg.torch_threads)
+inference_slots = InferenceSlots(cfg.inference_slots)
+
+service = GLiNER2Service(
+    model_name=cfg.model_name,
+    backend=create_backend(
+        cfg.model_backend,
+        cfg.model_name,
+        stub_latency_ms=cfg.stub_latency_ms,
+        stub_per_char_us=cfg.stub_per_char_us,
+        stub_confidence=cfg.stub_confidence,
+        stub_output_file=cfg.stub_output_file,
+    ),
+)
+document_sessions = DocumentSessionStore(service=service, max_sessions=cfg.document_sessions_max)
 
 app = FastAPI(
     title=APP_TITLE,
@@ -21,16 +45,32 @@ app = FastAPI(
 
 @app.get("/health")
 def health() -> dict[str, str]:
-    return {"status": "ok", "model": MODEL_NAME}
+    return {"status": "ok", "model": cfg.model_name, "backend": cfg.model_backend}
 
 
 @app.post("/extract", response_model=ExtractResponse)
 def extract_entities(payload: ExtractRequest) -> ExtractResponse:
-    entities = service.extract(
-        text=payload.text,
-        entities=payload.entities,
-        threshold=payload.threshold,
-        include_confidence=payload.include_confidence,
-        include_spans=payload.include_spans,
-    )
-    return ExtractResponse(model=MODEL_NAME, entities=entities)
+    with inference_slots.shared():
+        if payload.document_id is not None:
+            entities = document_sessions.extract(
+                document_id=payload.document_id,
+                text=payload.text,
+                entities=payload.entities,
+                threshold=payload.threshold,
+                include_confidence=payload.include_confidence,
+                include_spans=payload.include_spans,
+            )
+        else:
+            entities = service.extract(
+                text=payload.text,
+                entities=payload.entities,
+                threshold=payload.threshold,
+                include_confidence=payload.include_confidence,
+                include_spans=payload.include_spans,
+            )
+    return ExtractResponse(model=cfg.model_name, entities=entities)
+
+
+@app.delete("/documents/{document_id}")
+def discard_document(document_id: str) -> dict[str, str | bool]:
+    return {"document_id": document_id, "discarded": document_sessions.discard(document_id)}
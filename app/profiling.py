@@ -0,0 +1,236 @@
+"""Profiling bajo demanda de peticiones individuales.
+
+Una peticion se perfila si trae la cabecera de administrador con el token
+configurado o si cae dentro de la tasa de muestreo. El informe combina:
+
+- tiempos por fase medidos por el servicio (modelo, normalizacion) y, dentro
+  del modelo, tokenizacion / encoder / decodificacion de spans de gliner2
+- operadores de torch con mas tiempo propio de CPU (`torch.profiler`)
+- funciones Python con mas tiempo acumulado (`cProfile`)
+
+Con el profiling desactivado solo se evalua `ProfilingPolicy.should_profile`.
+
+El ID de cada informe lo genera el servidor; solo una peticion con el token de
+administrador puede fijarlo con `X-Request-ID`. Los informes muestreados se
+anuncian en el log y se pueden leer con su ID sin token: el ID es aleatorio y
+el cliente perfilado no lo recibe.
+"""
+
+from __future__ import annotations
+
+import cProfile
+import hmac
+import io
+import json
+import logging
+import pstats
+import random
+import time
+from collections import OrderedDict
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from threading import Lock
+from typing import Any
+
+logger = logging.getLogger("uvicorn.error.profiling")
+
+PROFILE_HEADER = "X-Profile-Token"
+REQUEST_ID_HEADER = "X-Request-ID"
+TOP_N = 25
+
+# Funciones de gliner2 (1.2.4) que delimitan las fases internas de la inferencia:
+# el collator tokeniza, `_extract_from_batch` ejecuta el encoder y decodifica
+# (`_extract_sample`), y `format_results` da formato a la salida.
+_GLINER2_STAGE_FUNCS = {
+    "collate": (("gliner2", "training", "trainer.py"), "__call__"),
+    "batch": (("gliner2", "inference", "engine.py"), "_extract_from_batch"),
+    "decode": (("gliner2", "inference", "engine.py"), "_extract_sample"),
+    "format": (("gliner2", "inference", "engine.py"), "format_results"),
+}
+
+
+def is_valid_request_id(request_id: str | None) -> bool:
+    # Se usa como nombre de fichero en `ProfileStore`; solo alfanumericos, '-' y '_'.
+    return bool(request_id) and len(request_id) <= 128 and all(ch.isalnum() or ch in "-_" for ch in request_id)
+
+
+class ProfilingPolicy:
+    def __init__(self, sample_rate: float = 0.0, admin_token: str | None = None) -> None:
+        self.sample_rate = sample_rate
+        self.admin_token = admin_token
+        self.enabled = sample_rate > 0.0 or admin_token is not None
+
+    def is_admin(self, token: str | None) -> bool:
+        if self.admin_token is None or token is None:
+            return False
+        return hmac.compare_digest(token.encode("utf-8"), self.admin_token.encode("utf-8"))
+
+    def should_profile(self, token: str | None) -> bool:
+        if not self.enabled:
+            return False
+        if self.is_admin(token):
+            return True
+        return self.sample_rate > 0.0 and random.random() < self.sample_rate
+
+
+class ProfileStore:
+    """Informes recientes en memoria (LRU) y, opcionalmente, en disco.
+
+    El directorio permite recuperar informes generados por otro worker de uvicorn.
+    """
+
+    def __init__(self, max_entries: int = 100, directory: str | None = None) -> None:
+        self.max_entries = max_entries
+        self.directory = Path(directory) if directory else None
+        self._entries: OrderedDict[str, dict[str, Any]] = OrderedDict()
+        self._lock = Lock()
+        if self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, request_id: str) -> Path | None:
+        if self.directory is None or not is_valid_request_id(request_id):
+            return None
+        return self.directory / f"{request_id}.json"
+
+    def exists(self, request_id: str) -> bool:
+        with self._lock:
+            if request_id in self._entries:
+                return True
+        path = self._path(request_id)
+        return path is not None and path.is_file()
+
+    def put(self, request_id: str, report: dict[str, Any]) -> bool:
+        """Guarda el informe; devuelve False (sin sobrescribir) si el ID ya existe."""
+        path = self._path(request_id)
+        with self._lock:
+            if request_id in self._entries or (path is not None and path.is_file()):
+                return False
+            self._entries[request_id] = report
+            self._entries.move_to_end(request_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        if path is not None:
+            try:
+                # "x": otro worker puede haber guardado el mismo ID en el directorio.
+                with path.open("x", encoding="utf-8") as fh:
+                    json.dump(report, fh, ensure_ascii=False, indent=2)
+            except FileExistsError:
+                with self._lock:
+                    self._entries.pop(request_id, None)
+                return False
+        logger.info("Profiling guardado: %s (%.1f ms)", request_id, report.get("total_ms", 0.0))
+        return True
+
+    def get(self, request_id: str) -> dict[str, Any] | None:
+        with self._lock:
+            report = self._entries.get(request_id)
+        if report is not None:
+            return report
+
+        path = self._path(request_id)
+        if path is None or not path.is_file():
+            return None
+        return json.loads(path.read_text(encoding="utf-8"))
+
+
+def _top_torch_ops(prof: Any, limit: int) -> list[dict[str, Any]]:
+    events = sorted(prof.key_averages(), key=lambda e: e.self_cpu_time_total, reverse=True)
+    return [
+        {
+            "name": event.key,
+            "calls": event.count,
+            "self_cpu_ms": round(event.self_cpu_time_total / 1000, 3),
+            "cpu_total_ms": round(event.cpu_time_total / 1000, 3),
+        }
+        for event in events[:limit]
+    ]
+
+
+def _gliner2_stages(profiler: cProfile.Profile) -> dict[str, float]:
+    """Tiempos (s) de tokenizacion, encoder y decodificacion a partir de cProfile."""
+    stats = pstats.Stats(profiler, stream=io.StringIO())
+    cumulative: dict[str, float] = {}
+    for (filename, _, func), (_, _, _, cumtime, _) in stats.stats.items():  # type: ignore[attr-defined]
+        parts = Path(filename).parts
+        for stage, (suffix, name) in _GLINER2_STAGE_FUNCS.items():
+            if func == name and parts[-len(suffix):] == suffix:
+                cumulative[stage] = cumulative.get(stage, 0.0) + cumtime
+
+    if "batch" not in cumulative:
+        # Backend sin gliner2 (stub) o version con otra estructura interna.
+        return {}
+    decode = cumulative.get("decode", 0.0)
+    return {
+        "tokenization": cumulative.get("collate", 0.0),
+        "encoder": max(0.0, cumulative["batch"] - decode),
+        "span_decoding": decode + cumulative.get("format", 0.0),
+    }
+
+
+def _top_python_hotspots(profiler: cProfile.Profile, limit: int) -> list[dict[str, Any]]:
+    stats = pstats.Stats(profiler, stream=io.StringIO())
+    rows = []
+    for (filename, lineno, func), (_, ncalls, tottime, cumtime, _) in stats.stats.items():  # type: ignore[attr-defined]
+        rows.append(
+            {
+                "function": f"{func} ({Path(filename).name}:{lineno})",
+                "calls": ncalls,
+                "self_ms": round(tottime * 1000, 3),
+                "cumulative_ms": round(cumtime * 1000, 3),
+            }
+        )
+    rows.sort(key=lambda row: row["cumulative_ms"], reverse=True)
+    return rows[:limit]
+
+
+class RequestProfiler:
+    """Ejecuta un bloque bajo cProfile y torch.profiler y deja el informe en `report`.
+
+    torch.profiler no admite sesiones simultaneas, asi que solo se perfila una
+    peticion a la vez; si hay otra en curso, la nueva se ejecuta sin perfilar.
+    El llamador debe garantizar que no hay otras inferencias en el proceso
+    (`InferenceSlots.exclusive`): torch.profiler registra todos los hilos.
+    """
+
+    _active = Lock()
+
+    def __init__(self, request_id: str, sampled: bool = False, top_n: int = TOP_N) -> None:
+        self.request_id = request_id
+        self.sampled = sampled
+        self.top_n = top_n
+        self.timings: dict[str, float] = {}
+        self.report: dict[str, Any] | None = None
+
+    @contextmanager
+    def profile(self) -> Iterator[dict[str, float] | None]:
+        if not self._active.acquire(blocking=False):
+            yield None
+            return
+
+        try:
+            from torch.profiler import ProfilerActivity, profile
+
+            py_profiler = cProfile.Profile()
+            t0 = time.perf_counter()
+            with profile(activities=[ProfilerActivity.CPU]) as torch_prof:
+                py_profiler.enable()
+                try:
+                    yield self.timings
+                finally:
+                    py_profiler.disable()
+            total_ms = (time.perf_counter() - t0) * 1000
+            self.timings.update(_gliner2_stages(py_profiler))
+
+            self.report = {
+                "request_id": self.request_id,
+                "sampled": self.sampled,
+                "created_at": time.time(),
+                "total_ms": round(total_ms, 3),
+                "phases_ms": {name: round(value * 1000, 3) for name, value in self.timings.items()},
+                "top_torch_ops": _top_torch_ops(torch_prof, self.top_n),
+                "top_python_hotspots": _top_python_hotspots(py_profiler, self.top_n),
+            }
+        finally:
+            self._active.release()
@@ -27,6 +27,14 @@ class ExtractRequest(BaseModel):
         default=True,
         description="Si es true, pide posiciones start/end por entidad",
     )
+    document_id: str | None = Field(
+        default=None,
+        max_length=256,
+        description=(
+            "Identificador de documento para re-extraccion incremental: solo se "
+            "reprocesan las frases que cambian respecto al envio anterior"
+        ),
+    )
 
 
 class ExtractedEntity(BaseModel):
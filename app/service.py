@@ -1,28 +1,24 @@
 from __future__ import annotations
 
+import time
 from collections.abc import Iterable
-from threading import Lock
-
-from gliner2 import GLiNER2
+from typing import Any
 
+from app.backends import GLiNER2Backend, ModelBackend
 from app.schemas import EntityDefinition, ExtractedEntity
 
 
 class GLiNER2Service:
-    def __init__(self, model_name: str = "fastino/gliner2-multi-v1") -> None:
+    def __init__(
+        self,
+        model_name: str = "fastino/gliner2-multi-v1",
+        backend: ModelBackend | None = None,
+    ) -> None:
         self.model_name = model_name
-        self._model: GLiNER2 | None = None
-        self._lock = Lock()
-
-    def load_model(self) -> GLiNER2:
-        if self._model is not None:
-            return self._model
-
-        with self._lock:
-            if self._model is None:
-                self._model = GLiNER2.from_pretrained(self.model_name)
+        self.backend: ModelBackend = backend or GLiNER2Backend(model_name=model_name)
 
-        return self._model
+    def load_model(self) -> Any:
+        return self.backend.load()
 
     @staticmethod
     def _build_schema(entities: Iterable[EntityDefinition]) -> dict[str, str]:
@@ -35,16 +31,27 @@ class GLiNER2Service:
         threshold: float = 0.5,
         include_confidence: bool = True,
         include_spans: bool = True,
+        timings: dict[str, float] | None = None,
+        deduplicate: bool = True,
     ) -> list[ExtractedEntity]:
-        model = self.load_model()
+        # `timings` solo se pasa al perfilar; si es None no se mide nada. Los tiempos
+        # se acumulan para cubrir varias llamadas en la misma peticion (modo incremental).
+        # `deduplicate=False` conserva todas las apariciones de cada texto; el modo
+        # incremental deduplica despues sobre el documento entero.
+        if timings is not None:
+            t0 = time.perf_counter()
         schema = self._build_schema(entities)
-        raw_entities = model.extract_entities(
+        raw_entities = self.backend.extract_entities(
             text=text,
             schema=schema,
             threshold=threshold,
             include_confidence=include_confidence,
             include_spans=include_spans,
+            deduplicate=deduplicate,
         )
+        if timings is not None:
+            t1 = time.perf_counter()
+            timings["model"] = timings.get("model", 0.0) + t1 - t0
 
         normalized: list[ExtractedEntity] = []
         entities_by_label = raw_entities.get("entities", {})
@@ -67,4 +74,6 @@ class GLiNER2Service:
                             label=label,
                         )
                     )
+        if timings is not None:
+            timings["normalization"] = timings.get("normalization", 0.0) + time.perf_counter() - t1
         return normalized
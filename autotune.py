@@ -0,0 +1,412 @@
+"""Autoajuste de hilos de torch, slots de inferencia y procesos para la API.
+
+Arranca procesos de benchmark (uno por worker, cada uno con su copia del modelo),
+ejecuta una carga de trabajo representativa sobre una rejilla de combinaciones
+(procesos x hilos intra-op x peticiones concurrentes) con todos los procesos de
+la prueba a la vez, mide throughput total y latencia p95, y guarda la mejor
+combinacion en la configuracion (`config/app_config.json` por defecto). El numero
+de procesos se limita por un presupuesto de memoria.
+
+`run_api.py` aplica los tres valores al arrancar; `app.main` aplica `torch_threads`
+e `inference_slots` (los procesos se fijan con `uvicorn --workers`).
+
+Uso:
+  python3 autotune.py
+  python3 autotune.py --workload-file requests.jsonl --requests 64
+  python3 autotune.py --max-p95-ms 800 --dry-run
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from app.schemas import EntityDefinition
+from app.service import GLiNER2Service
+from config_loader import get_config, update_config_file
+from infer import load_schema
+
+# Longitudes (en palabras) tipicas de los textos que recibe la API.
+SYNTHETIC_LENGTHS = (12, 25, 40, 80, 150, 300)
+SYNTHETIC_SENTENCES = (
+    "Ana Garcia Lopez, con DNI 12345678Z, vive en Madrid desde 2015.",
+    "El perro de la familia, llamado Toby, se perdio cerca de Valencia.",
+    "Juan Martinez firmo el contrato en Sevilla junto a su abogada Marta Ruiz.",
+    "La gata Luna fue adoptada por Pedro Sanchez en Bilbao.",
+    "El expediente indica que el titular reside actualmente en Zaragoza.",
+    "Se adjunta copia del documento 87654321X perteneciente a Laura Gomez.",
+)
+
+
+@dataclass(frozen=True)
+class Workload:
+    text: str
+    entities: list[EntityDefinition]
+    threshold: float
+
+
+@dataclass(frozen=True)
+class TrialResult:
+    torch_threads: int
+    inference_slots: int
+    workers: int
+    throughput: float
+    p95_ms: float
+    mean_ms: float
+
+
+def parse_args() -> argparse.Namespace:
+    cfg = get_config()
+    parser = argparse.ArgumentParser(description="Autoajuste de hilos/concurrencia para la API GLiNER2")
+    parser.add_argument("--model", default=cfg.model_name, help="Modelo HF o ruta local")
+    parser.add_argument(
+        "--workload-file",
+        default="requests.jsonl",
+        help="JSONL con peticiones de /extract o muestras de test (si no existe, se usan textos sinteticos)",
+    )
+    parser.add_argument(
+        "--schema-file",
+        default="data/entity_descriptions.json",
+        help="Schema usado cuando la muestra no trae entidades",
+    )
+    parser.add_argument("--requests", type=int, default=48, help="Peticiones medidas por combinacion (total)")
+    parser.add_argument(
+        "--warmup",
+        type=int,
+        default=4,
+        help="Peticiones de calentamiento por proceso y combinacion",
+    )
+    parser.add_argument(
+        "--threads",
+        default="",
+        help="Lista de hilos intra-op a probar, ej: 1,2,4 (vacio = potencias de 2 hasta nucleos)",
+    )
+    parser.add_argument(
+        "--slots",
+        default="",
+        help="Lista de peticiones concurrentes a probar, ej: 1,2,4 (vacio = potencias de 2 hasta nucleos)",
+    )
+    parser.add_argument(
+        "--workers",
+        default="",
+        help="Lista de procesos a probar, ej: 1,2,4 (vacio = potencias de 2 hasta nucleos)",
+    )
+    parser.add_argument(
+        "--memory-budget-mb",
+        type=float,
+        default=0.0,
+        help="Memoria disponible para los workers (0 = 80%% de la RAM); limita cuantas copias del modelo caben",
+    )
+    parser.add_argument(
+        "--max-p95-ms",
+        type=float,
+        default=0.0,
+        help="Descartar combinaciones con p95 superior (0 = sin limite)",
+    )
+    parser.add_argument("--config-file", default=None, help="Archivo de configuracion a actualizar")
+    parser.add_argument("--dry-run", action="store_true", help="No escribir la configuracion")
+    parser.add_argument("--seed", type=int, default=42)
+    return parser.parse_args()
+
+
+def parse_int_list(raw: str, default: list[int]) -> list[int]:
+    if not raw.strip():
+        return default
+    values = sorted({int(item) for item in raw.split(",") if item.strip()})
+    if not values or values[0] < 1:
+        raise ValueError(f"Lista invalida: {raw!r} (valores enteros >= 1)")
+    return values
+
+
+def powers_of_two(limit: int) -> list[int]:
+    values = [1]
+    while values[-1] * 2 <= limit:
+        values.append(values[-1] * 2)
+    if values[-1] != limit:
+        values.append(limit)
+    return values
+
+
+def to_entity_defs(schema: dict[str, str]) -> list[EntityDefinition]:
+    return [EntityDefinition(name=key, definition=value) for key, value in schema.items()]
+
+
+def parse_workload_row(row: dict[str, Any], default_schema: dict[str, str]) -> Workload | None:
+    # Formato peticion de /extract.
+    if isinstance(row.get("text"), str):
+        entities = row.get("entities") or []
+        entity_defs = [EntityDefinition(**item) for item in entities] or to_entity_defs(default_schema)
+        return Workload(
+            text=row["text"],
+            entities=entity_defs,
+            threshold=float(row.get("threshold", 0.5)),
+        )
+
+    # Formato de dataset (scripts/test.py).
+    input_field = row.get("input", "")
+    text = input_field.get("text", "") if isinstance(input_field, dict) else str(input_field)
+    if not text:
+        return None
+    descriptions = row.get("entity_descriptions")
+    schema = (
+        {str(k): str(v) for k, v in descriptions.items()}
+        if isinstance(descriptions, dict) and descriptions
+        else default_schema
+    )
+    return Workload(text=text, entities=to_entity_defs(schema), threshold=0.5)
+
+
+def synthetic_workload(schema: dict[str, str], count: int, rng: random.Random) -> list[Workload]:
+    entity_defs = to_entity_defs(schema)
+    workload: list[Workload] = []
+    for i in range(count):
+        target_words = SYNTHETIC_LENGTHS[i % len(SYNTHETIC_LENGTHS)]
+        words: list[str] = []
+        while len(words) < target_words:
+            words.extend(rng.choice(SYNTHETIC_SENTENCES).split())
+        workload.append(Workload(text=" ".join(words[:target_words]), entities=entity_defs, threshold=0.5))
+    return workload
+
+
+def load_workload(path_str: str, schema: dict[str, str], count: int, rng: random.Random) -> list[Workload]:
+    path = Path(path_str)
+    if not path.is_file():
+        print(f"No existe {path}; usando {count} textos sinteticos.")
+        return synthetic_workload(schema, count, rng)
+
+    workload: list[Workload] = []
+    for line in path.read_text(encoding="utf-8").splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        row = json.loads(line)
+        if not isinstance(row, dict):
+            continue
+        item = parse_workload_row(row, schema)
+        if item is not None:
+            workload.append(item)
+
+    if not workload:
+        print(f"{path} no contiene muestras validas; usando {count} textos sinteticos.")
+        return synthetic_workload(schema, count, rng)
+
+    print(f"Carga de trabajo: {len(workload)} muestras de {path}")
+    return workload
+
+
+def _run_local(
+    service: GLiNER2Service,
+    batch: list[Workload],
+    inference_slots: int,
+) -> tuple[list[float], float, float]:
+    def call(item: Workload) -> float:
+        t0 = time.perf_counter()
+        service.extract(text=item.text, entities=item.entities, threshold=item.threshold)
+        return time.perf_counter() - t0
+
+    with ThreadPoolExecutor(max_workers=inference_slots) as pool:
+        # `time.monotonic` es comparable entre procesos del mismo host.
+        started = time.monotonic()
+        latencies = list(pool.map(call, batch))
+        finished = time.monotonic()
+    return latencies, started, finished
+
+
+def _worker_main(conn: Any, model_name: str, workload: list[Workload]) -> None:
+    """Proceso de benchmark: carga el modelo una vez y ejecuta las pruebas que le pide el padre."""
+    import resource
+
+    import torch
+
+    service = GLiNER2Service(model_name=model_name)
+    service.load_model()
+    # ru_maxrss esta en KB en Linux.
+    conn.send(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024)
+
+    while True:
+        message = conn.recv()
+        if message is None:
+            break
+        torch_threads, inference_slots, num_requests, warmup, offset = message
+        torch.set_num_threads(torch_threads)
+        batch = [workload[(offset + i) % len(workload)] for i in range(num_requests)]
+
+        _run_local(service, batch[:warmup], inference_slots)
+        conn.send("ready")
+        conn.recv()  # arranque simultaneo de todos los procesos de la prueba
+        conn.send(_run_local(service, batch, inference_slots))
+    conn.close()
+
+
+class WorkerPool:
+    """Procesos con el modelo ya cargado, reutilizados en todas las pruebas."""
+
+    def __init__(self, model_name: str, workload: list[Workload]) -> None:
+        self.model_name = model_name
+        self.workload = workload
+        self._ctx = multiprocessing.get_context("spawn")
+        self._workers: list[tuple[Any, Any]] = []
+        self.model_rss_mb = 0.0
+
+    def start(self, count: int) -> None:
+        while len(self._workers) < count:
+            parent_conn, child_conn = self._ctx.Pipe()
+            process = self._ctx.Process(
+                target=_worker_main,
+                args=(child_conn, self.model_name, self.workload),
+                daemon=True,
+            )
+            process.start()
+            self.model_rss_mb = max(self.model_rss_mb, parent_conn.recv())
+            self._workers.append((process, parent_conn))
+
+    def run_trial(
+        self,
+        workers: int,
+        torch_threads: int,
+        inference_slots: int,
+        num_requests: int,
+        warmup: int,
+    ) -> TrialResult:
+        active = self._workers[:workers]
+        per_worker = max(inference_slots, math.ceil(num_requests / workers))
+        for index, (_, conn) in enumerate(active):
+            conn.send((torch_threads, inference_slots, per_worker, warmup, index * per_worker))
+        for _, conn in active:
+            conn.recv()
+        for _, conn in active:
+            conn.send("go")
+
+        latencies: list[float] = []
+        starts: list[float] = []
+        ends: list[float] = []
+        for _, conn in active:
+            worker_latencies, started, finished = conn.recv()
+            latencies.extend(worker_latencies)
+            starts.append(started)
+            ends.append(finished)
+
+        latencies.sort()
+        p95 = latencies[max(0, int(round(0.95 * len(latencies))) - 1)]
+        return TrialResult(
+            torch_threads=torch_threads,
+            inference_slots=inference_slots,
+            workers=workers,
+            throughput=len(latencies) / (max(ends) - min(starts)),
+            p95_ms=p95 * 1000,
+            mean_ms=statistics.fmean(latencies) * 1000,
+        )
+
+    def close(self) -> None:
+        for process, conn in self._workers:
+            conn.send(None)
+            process.join(timeout=10)
+        self._workers.clear()
+
+
+def default_memory_budget_mb() -> float:
+    try:
+        total = os.sysconf("SC_PHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (AttributeError, ValueError, OSError):
+        return 0.0
+    # Margen para el sistema y los picos de memoria de la inferencia.
+    return total * 0.8 / (1024 * 1024)
+
+
+def pick_best(results: list[TrialResult], max_p95_ms: float) -> TrialResult:
+    candidates = [r for r in results if max_p95_ms <= 0 or r.p95_ms <= max_p95_ms]
+    if not candidates:
+        print(f"Ninguna combinacion cumple p95 <= {max_p95_ms:.0f} ms; se elige la de menor p95.")
+        return min(results, key=lambda r: r.p95_ms)
+    return max(candidates, key=lambda r: (r.throughput, -r.p95_ms))
+
+
+def main() -> None:
+    args = parse_args()
+    if args.requests < 1:
+        raise ValueError("--requests debe ser >= 1")
+
+    cpu_count = os.cpu_count() or 1
+    thread_grid = parse_int_list(args.threads, powers_of_two(cpu_count))
+    slot_grid = parse_int_list(args.slots, powers_of_two(cpu_count))
+    worker_grid = parse_int_list(args.workers, powers_of_two(cpu_count))
+
+    rng = random.Random(args.seed)
+    schema = load_schema(args.schema_file)
+    workload = load_workload(args.workload_file, schema, args.requests, rng)
+
+    print("Cargando modelo en el primer proceso de benchmark...")
+    pool = WorkerPool(model_name=args.model, workload=workload)
+    try:
+        pool.start(1)
+        # Cada worker de uvicorn carga su propia copia del modelo.
+        budget_mb = args.memory_budget_mb if args.memory_budget_mb > 0 else default_memory_budget_mb()
+        max_workers = max(worker_grid)
+        if budget_mb > 0 and pool.model_rss_mb > 0:
+            max_workers = min(max_workers, max(1, int(budget_mb // pool.model_rss_mb)))
+        worker_grid = [w for w in worker_grid if w <= max_workers] or [1]
+        print(
+            f"Modelo: {args.model} | nucleos: {cpu_count} | memoria por proceso: {pool.model_rss_mb:.0f} MB "
+            f"| presupuesto: {budget_mb:.0f} MB | max workers: {max(worker_grid)}\n"
+        )
+        pool.start(max(worker_grid))
+
+        results: list[TrialResult] = []
+        for workers in worker_grid:
+            for torch_threads in thread_grid:
+                for inference_slots in slot_grid:
+                    # Evitar sobresuscripcion: hilos totales del host <= nucleos.
+                    if workers * torch_threads * inference_slots > cpu_count:
+                        continue
+                    result = pool.run_trial(
+                        workers=workers,
+                        torch_threads=torch_threads,
+                        inference_slots=inference_slots,
+                        num_requests=args.requests,
+                        warmup=args.warmup,
+                    )
+                    results.append(result)
+                    print(
+                        f"workers={workers:<3} threads={torch_threads:<3} slots={inference_slots:<3} "
+                        f"| {result.throughput:7.2f} req/s | p95={result.p95_ms:8.1f} ms "
+                        f"| media={result.mean_ms:8.1f} ms"
+                    )
+    finally:
+        pool.close()
+
+    if not results:
+        raise ValueError("La rejilla no contiene combinaciones validas para este host.")
+
+    best = pick_best(results, args.max_p95_ms)
+    tuned = {
+        "torch_threads": best.torch_threads,
+        "inference_slots": best.inference_slots,
+        "workers": best.workers,
+    }
+
+    print("\n=== Mejor configuracion ===")
+    print(
+        f"torch_threads={best.torch_threads} | inference_slots={best.inference_slots} | workers={best.workers} "
+        f"| {best.throughput:.2f} req/s en total | p95={best.p95_ms:.1f} ms"
+    )
+
+    if args.dry_run:
+        print("--dry-run: configuracion no guardada.")
+        return
+
+    path = update_config_file(tuned, args.config_file)
+    print(f"Configuracion guardada en {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""Comprobacion determinista de la re-extraccion incremental con el backend stub.
+
+Para cada flujo (edicion, insercion, borrado, cambio de parametros, entidades
+repetidas y entidades que cruzan el corte de una ventana) compara la salida de
+`DocumentSessionStore` con una pasada completa de `GLiNER2Service` y verifica
+que cada entidad coincide con `text[start:end]`.
+
+Uso:
+  python3 check_incremental.py
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Any
+
+from app.backends import StubBackend
+from app.incremental import MAX_SEGMENT_CHARS, DocumentSessionStore
+from app.schemas import EntityDefinition, ExtractedEntity
+from app.service import GLiNER2Service
+
+ENTITIES = [
+    EntityDefinition(name="persona", definition="Nombre completo de una persona"),
+    EntityDefinition(name="ciudad", definition="Nombre de una ciudad"),
+]
+
+BASE_TEXT = (
+    "Ana Garcia vive en Madrid. Luis Perez trabaja en Sevilla.\n"
+    "El perro Toby ladra mucho! La gata Luna duerme en Bilbao. Fin del Informe."
+)
+
+
+class NameStub(StubBackend):
+    """Stub local: entidades = secuencias de palabras en mayuscula (una o varias).
+
+    A diferencia de `StubBackend`, la etiqueta y la confianza dependen solo del
+    texto de la entidad (no de su posicion en la llamada), asi que reprocesar un
+    fragmento da lo mismo que la pasada completa. Como gliner2, ordena cada
+    etiqueta por confianza y descarta textos repetidos salvo con
+    `deduplicate=False`. Cuenta los caracteres recibidos para comprobar que solo
+    se reprocesa lo editado.
+    """
+
+    _NAME = re.compile(r"[A-Z]\w*(?: [A-Z]\w*)*")
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.chars_seen = 0
+
+    @staticmethod
+    def confidence_for(text: str) -> float:
+        return 0.6 + (sum(map(ord, text)) % 40) / 100
+
+    def extract_entities(
+        self,
+        text: str,
+        schema: dict[str, str],
+        threshold: float,
+        include_confidence: bool,
+        include_spans: bool,
+        deduplicate: bool = True,
+    ) -> dict[str, Any]:
+        self.chars_seen += len(text)
+        labels = list(schema.keys())
+        spans: dict[str, list[tuple[str, float, int, int]]] = {label: [] for label in labels}
+        for match in self._NAME.finditer(text):
+            confidence = self.confidence_for(match.group())
+            if confidence >= threshold:
+                label = labels[len(match.group()) % len(labels)]
+                spans[label].append((match.group(), confidence, match.start(), match.end()))
+
+        by_label: dict[str, list[Any]] = {}
+        for label, label_spans in spans.items():
+            label_spans.sort(key=lambda span: span[1], reverse=True)
+            seen: set[str] = set()
+            by_label[label] = []
+            for entity_text, confidence, start, end in label_spans:
+                if deduplicate and entity_text.lower() in seen:
+                    continue
+                seen.add(entity_text.lower())
+                value: dict[str, Any] = {"text": entity_text}
+                if include_confidence:
+                    value["confidence"] = confidence
+                if include_spans:
+                    value.update(start=start, end=end)
+                by_label[label].append(value)
+        return {"entities": by_label}
+
+
+def check(condition: bool, message: str) -> None:
+    if not condition:
+        raise AssertionError(message)
+
+
+def as_tuples(entities: list[ExtractedEntity]) -> list[tuple[Any, ...]]:
+    return [(e.label, e.text, e.start, e.end, e.score) for e in entities]
+
+
+def check_against_full_pass(
+    name: str,
+    store: DocumentSessionStore,
+    service: GLiNER2Service,
+    text: str,
+    threshold: float = 0.5,
+    include_confidence: bool = True,
+    include_spans: bool = True,
+    document_id: str = "doc",
+) -> int:
+    """Compara con la pasada completa y devuelve los caracteres que reproceso el modo incremental."""
+    options = {"threshold": threshold, "include_confidence": include_confidence, "include_spans": include_spans}
+    backend: NameStub = service.backend  # type: ignore[assignment]
+    chars_before = backend.chars_seen
+    incremental = store.extract(document_id, text, ENTITIES, **options)
+    reprocessed = backend.chars_seen - chars_before
+    full = service.extract(text, ENTITIES, **options)
+    check(as_tuples(incremental) == as_tuples(full), f"{name}: difiere de la pasada completa")
+    for entity in incremental if include_spans else []:
+        check(
+            entity.start is not None and text[entity.start:entity.end] == entity.text,
+            f"{name}: offsets incorrectos para {entity.text!r}",
+        )
+    return reprocessed
+
+
+def main() -> None:
+    backend = NameStub()
+    service = GLiNER2Service(backend=backend)
+    store = DocumentSessionStore(service=service)
+
+    check_against_full_pass("primera pasada", store, service, BASE_TEXT)
+
+    edited = BASE_TEXT.replace("Luis Perez trabaja", "Pedro Gomez Ruiz trabaja")
+    reprocessed = check_against_full_pass("edicion", store, service, edited)
+    check(0 < reprocessed < len(edited) // 2, f"edicion: se reprocesaron {reprocessed} de {len(edited)} caracteres")
+
+    inserted = "Nota de Marta Ruiz. " + edited + "\nFirmado en Toledo."
+    check_against_full_pass("insercion", store, service, inserted)
+
+    deleted = inserted.replace("El perro Toby ladra mucho! ", "")
+    check_against_full_pass("borrado", store, service, deleted)
+
+    check_against_full_pass("cambio de umbral", store, service, deleted, threshold=0.95)
+    check_against_full_pass("vuelta al umbral", store, service, deleted)
+    check_against_full_pass("sin confianza ni spans", store, service, deleted, include_confidence=False, include_spans=False)
+
+    # gliner2 solo devuelve la primera aparicion de cada texto por etiqueta: al editar
+    # el segmento que la tenia, la repeticion de otro segmento debe aparecer, y un
+    # segmento reprocesado no debe duplicar un texto que ya tiene otro segmento.
+    repeated = "Vivo en Madrid. Trabajo en Sevilla. Vuelvo a Madrid."
+    check_against_full_pass("repetidas", store, service, repeated, document_id="rep")
+    repeated = repeated.replace("Vivo en Madrid.", "Ahora vivo en Madrid.")
+    check_against_full_pass("repetidas, edicion de la primera", store, service, repeated, document_id="rep")
+    repeated = repeated.replace("Ahora vivo en Madrid.", "Ahora vivo en Bilbao.")
+    check_against_full_pass("repetidas, borrado de la primera", store, service, repeated, document_id="rep")
+    repeated = repeated.replace("Trabajo en Sevilla.", "Trabajo en MADRID.")
+    check_against_full_pass("repetidas, nueva en otro segmento", store, service, repeated, document_id="rep")
+
+    # Frase mas larga que una ventana: el nombre queda partido por el corte.
+    filler = "palabra " * ((MAX_SEGMENT_CHARS - 12) // len("palabra "))
+    long_text = filler + "Ana Maria Lopez Garcia vive aqui. Luis vive en Cadiz."
+    check_against_full_pass("ventana partida", store, service, long_text)
+    check_against_full_pass(
+        "edicion tras el corte", store, service, long_text.replace("vive aqui", "vive alli")
+    )
+
+    check(store.discard("doc"), "discard: la sesion deberia existir")
+    check(not store.discard("doc"), "discard: la sesion ya no deberia existir")
+    print("OK: re-extraccion incremental coincide con la pasada completa")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,14 +7,39 @@ from pathlib import Path
 from typing import Any
 
 DEFAULT_MODEL_NAME = "fastino/gliner2-multi-v1"
+DEFAULT_MODEL_BACKEND = "gliner2"
 DEFAULT_PORT = 8000
 DEFAULT_CONFIG_FILE = "config/app_config.json"
+DEFAULT_INFERENCE_SLOTS = 1
+DEFAULT_WORKERS = 1
+DEFAULT_PROFILING_MAX_ENTRIES = 100
+DEFAULT_DOCUMENT_SESSIONS_MAX = 1000
 
 
 @dataclass(frozen=True)
 class AppConfig:
     model_name: str
     port: int
+    # "gliner2" (modelo real) o "stub" (salida determinista, ver app/backends.py).
+    model_backend: str = DEFAULT_MODEL_BACKEND
+    stub_latency_ms: float = 0.0
+    stub_per_char_us: float = 0.0
+    stub_confidence: float = 0.9
+    # JSON con la salida cruda fija del stub; None = entidades derivadas del texto.
+    stub_output_file: str | None = None
+    # Cargar el modelo al arrancar la API en vez de en la primera peticion.
+    preload_model: bool = True
+    # None = dejar que torch decida el numero de hilos intra-op.
+    torch_threads: int | None = None
+    inference_slots: int = DEFAULT_INFERENCE_SLOTS
+    workers: int = DEFAULT_WORKERS
+    # Profiling por peticion: muestreo aleatorio y/o cabecera de administrador.
+    profiling_sample_rate: float = 0.0
+    profiling_admin_token: str | None = None
+    profiling_dir: str | None = None
+    profiling_max_entries: int = DEFAULT_PROFILING_MAX_ENTRIES
+    # Documentos recordados en memoria para la re-extraccion incremental.
+    document_sessions_max: int = DEFAULT_DOCUMENT_SESSIONS_MAX
 
 
 def _read_config(path: str) -> dict[str, Any]:
@@ -35,6 +60,44 @@ def _parse_port(value: Any) -> int:
     return port
 
 
+def _parse_positive_int(value: Any, key: str) -> int:
+    parsed = int(value)
+    if parsed < 1:
+        raise ValueError(f"Valor invalido para {key}: {parsed} (debe ser >= 1)")
+    return parsed
+
+
+def _parse_optional_positive_int(value: Any, key: str) -> int | None:
+    if value is None or value == "":
+        return None
+    return _parse_positive_int(value, key)
+
+
+def _parse_bool(value: Any) -> bool:
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in {"1", "true", "yes", "si", "on"}:
+        return True
+    if text in {"0", "false", "no", "off"}:
+        return False
+    raise ValueError(f"Valor booleano invalido: {value}")
+
+
+def _parse_rate(value: Any, key: str) -> float:
+    rate = float(value)
+    if rate < 0.0 or rate > 1.0:
+        raise ValueError(f"Valor invalido para {key}: {rate} (debe estar en [0, 1])")
+    return rate
+
+
+def _optional_str(value: Any) -> str | None:
+    if value is None:
+        return None
+    text = str(value).strip()
+    return text or None
+
+
 def get_config() -> AppConfig:
     config_file = os.getenv("APP_CONFIG_FILE", DEFAULT_CONFIG_FILE)
     from_file = _read_config(config_file)
@@ -48,4 +111,82 @@ def get_config() -> AppConfig:
     port_raw = os.getenv("APP_PORT") or os.getenv("PORT") or from_file.get("port", DEFAULT_PORT)
     port = _parse_port(port_raw)
 
-    return AppConfig(model_name=model_name, port=port)
+    model_backend = (
+        os.getenv("APP_MODEL_BACKEND") or str(from_file.get("model_backend", DEFAULT_MODEL_BACKEND))
+    ).strip().lower()
+    stub_latency_ms = float(os.getenv("APP_STUB_LATENCY_MS") or from_file.get("stub_latency_ms", 0.0))
+    if stub_latency_ms < 0:
+        raise ValueError(f"Valor invalido para stub_latency_ms: {stub_latency_ms} (debe ser >= 0)")
+    stub_per_char_us = float(os.getenv("APP_STUB_PER_CHAR_US") or from_file.get("stub_per_char_us", 0.0))
+    if stub_per_char_us < 0:
+        raise ValueError(f"Valor invalido para stub_per_char_us: {stub_per_char_us} (debe ser >= 0)")
+    stub_confidence = _parse_rate(
+        os.getenv("APP_STUB_CONFIDENCE") or from_file.get("stub_confidence", 0.9),
+        "stub_confidence",
+    )
+    stub_output_file = _optional_str(os.getenv("APP_STUB_OUTPUT_FILE") or from_file.get("stub_output_file"))
+
+    preload_model = _parse_bool(os.getenv("APP_PRELOAD_MODEL") or from_file.get("preload_model", True))
+
+    torch_threads = _parse_optional_positive_int(
+        os.getenv("APP_TORCH_THREADS") or from_file.get("torch_threads"),
+        "torch_threads",
+    )
+    inference_slots = _parse_positive_int(
+        os.getenv("APP_INFERENCE_SLOTS") or from_file.get("inference_slots", DEFAULT_INFERENCE_SLOTS),
+        "inference_slots",
+    )
+    workers = _parse_positive_int(
+        os.getenv("APP_WORKERS") or from_file.get("workers", DEFAULT_WORKERS),
+        "workers",
+    )
+
+    profiling_sample_rate = _parse_rate(
+        os.getenv("APP_PROFILING_SAMPLE_RATE") or from_file.get("profiling_sample_rate", 0.0),
+        "profiling_sample_rate",
+    )
+    profiling_admin_token = _optional_str(
+        os.getenv("APP_PROFILING_ADMIN_TOKEN") or from_file.get("profiling_admin_token")
+    )
+    profiling_dir = _optional_str(os.getenv("APP_PROFILING_DIR") or from_file.get("profiling_dir"))
+    profiling_max_entries = _parse_positive_int(
+        os.getenv("APP_PROFILING_MAX_ENTRIES")
+        or from_file.get("profiling_max_entries", DEFAULT_PROFILING_MAX_ENTRIES),
+        "profiling_max_entries",
+    )
+    document_sessions_max = _parse_positive_int(
+        os.getenv("APP_DOCUMENT_SESSIONS_MAX")
+        or from_file.get("document_sessions_max", DEFAULT_DOCUMENT_SESSIONS_MAX),
+        "document_sessions_max",
+    )
+
+    return AppConfig(
+        model_name=model_name,
+        port=port,
+        model_backend=model_backend,
+        stub_latency_ms=stub_latency_ms,
+        stub_per_char_us=stub_per_char_us,
+        stub_confidence=stub_confidence,
+        stub_output_file=stub_output_file,
+        preload_model=preload_model,
+        torch_threads=torch_threads,
+        inference_slots=inference_slots,
+        workers=workers,
+        profiling_sample_rate=profiling_sample_rate,
+        profiling_admin_token=profiling_admin_token,
+        profiling_dir=profiling_dir,
+        profiling_max_entries=profiling_max_entries,
+        document_sessions_max=document_sessions_max,
+    )
+
+
+def update_config_file(values: dict[str, Any], path: str | None = None) -> Path:
+    """Mezcla `values` en el archivo de configuracion preservando el resto de claves."""
+    config_file = path or os.getenv("APP_CONFIG_FILE", DEFAULT_CONFIG_FILE)
+    current = _read_config(config_file)
+    current.update(values)
+
+    cfg_path = Path(config_file)
+    cfg_path.parent.mkdir(parents=True, exist_ok=True)
+    cfg_path.write_text(json.dumps(current, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+    return cfg_path
@@ -82,62 +82,16 @@ def print_entities(entities: list[ExtractedEntity]) -> None:
         )
 
 
-class GLiNER2ServiceCompat(GLiNER2Service):
-    def extract(
-        self,
-        text: str,
-        entities: list[EntityDefinition],
-        threshold: float = 0.5,
-        include_confidence: bool = True,
-        include_spans: bool = True,
-    ) -> list[ExtractedEntity]:
-        model = self.load_model()
-        schema = self._build_schema(entities)
-        try:
-            raw_entities = model.extract_entities(
-                text=text,
-                schema=schema,
-                threshold=threshold,
-                include_confidence=include_confidence,
-                include_spans=include_spans,
-            )
-        except TypeError:
-            raw_entities = model.extract_entities(
-                text=text,
-                entity_types=list(schema.keys()),
-                threshold=threshold,
-                include_confidence=include_confidence,
-                include_spans=include_spans,
-            )
-
-        normalized: list[ExtractedEntity] = []
-        entities_by_label = raw_entities.get("entities", {})
-        for label, values in entities_by_label.items():
-            for value in values:
-                if isinstance(value, dict):
-                    normalized.append(
-                        ExtractedEntity(
-                            text=value.get("text", ""),
-                            label=label,
-                            score=value.get("confidence"),
-                            start=value.get("start"),
-                            end=value.get("end"),
-                        )
-                    )
-                else:
-                    normalized.append(ExtractedEntity(text=str(value), label=label))
-        return normalized
-
-
 def main() -> None:
     args = parse_args()
     schema = load_schema(args.schema_file)
     entity_defs = [EntityDefinition(name=key, definition=value) for key, value in schema.items()]
 
     print("Cargando modelo...")
-    service = GLiNER2ServiceCompat(model_name=args.model)
+    t0 = time.perf_counter()
+    service = GLiNER2Service(model_name=args.model)
     service.load_model()
-    print(f"Modelo: {args.model}")
+    print(f"Modelo: {args.model} (cargado en {time.perf_counter() - t0:.2f}s)")
     print(f"Entidades cargadas: {', '.join(schema.keys())}")
     print("Escribe un texto y pulsa Enter. Escribe 'salir' para terminar.\n")
 
@@ -0,0 +1,236 @@
+"""Prueba de carga de la capa HTTP con el backend stub (sin descargar el modelo).
+
+Mide primero la llamada directa a `service.extract` y despues la misma carga por
+HTTP contra la API arrancada con `APP_MODEL_BACKEND=stub` en un proceso uvicorn
+aparte (el cliente no compite por el GIL con el servidor). Ambas medidas usan la
+misma concurrencia, asi que la diferencia es el coste propio de
+FastAPI/uvicorn/validacion/serializacion.
+
+Uso:
+  python3 loadtest.py
+  python3 loadtest.py --app app.main:app --stub-latency-ms 20 --concurrency 8
+  python3 loadtest.py --requests 2000 --output-file bench_output.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+
+SAMPLE_WORDS = (
+    "Ana", "Garcia", "vive", "en", "Madrid", "con", "su", "perro", "Toby", "y", "trabaja",
+    "para", "Iberia", "desde", "2015", "el", "documento", "12345678Z", "pertenece", "a",
+    "Juan", "Martinez", "de", "Sevilla", "la", "gata", "Luna", "Bilbao",
+)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Prueba de carga de la API con backend stub")
+    parser.add_argument("--app", default="run_api:app", help="Aplicacion ASGI: run_api:app o app.main:app")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--requests", type=int, default=500, help="Peticiones medidas")
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=1, help="Clientes HTTP concurrentes")
+    parser.add_argument("--stub-latency-ms", type=float, default=0.0, help="Latencia simulada del modelo")
+    parser.add_argument(
+        "--stub-per-char-us",
+        type=float,
+        default=0.0,
+        help="Latencia simulada adicional por caracter del texto (microsegundos)",
+    )
+    parser.add_argument("--stub-confidence", type=float, default=0.9, help="Confianza de las entidades del stub")
+    parser.add_argument(
+        "--stub-output-file",
+        default=None,
+        help="JSON con la salida cruda fija del stub ({\"entities\": {...}})",
+    )
+    parser.add_argument("--text-words", type=int, default=60, help="Palabras por texto")
+    parser.add_argument(
+        "--schema-file",
+        default="data/entity_descriptions.json",
+        help="Archivo JSON con definiciones de entidades",
+    )
+    parser.add_argument("--output-file", default=None, help="Guardar resumen en JSON")
+    parser.add_argument("--seed", type=int, default=42)
+    return parser.parse_args()
+
+
+def build_payloads(schema: dict[str, str], count: int, words: int, rng: random.Random) -> list[dict[str, Any]]:
+    entities = [{"name": name, "definition": definition} for name, definition in schema.items()]
+    return [
+        {
+            "text": " ".join(rng.choice(SAMPLE_WORDS) for _ in range(words)),
+            "entities": entities,
+            "threshold": 0.5,
+            "include_confidence": True,
+            "include_spans": True,
+        }
+        for _ in range(count)
+    ]
+
+
+def summarize(latencies: list[float], elapsed: float) -> dict[str, float]:
+    ordered = sorted(latencies)
+    return {
+        "requests": len(ordered),
+        "requests_per_s": round(len(ordered) / elapsed, 2),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+        "p50_ms": round(ordered[len(ordered) // 2] * 1000, 3),
+        "p95_ms": round(ordered[max(0, int(round(0.95 * len(ordered))) - 1)] * 1000, 3),
+    }
+
+
+def measure_direct(service: Any, payloads: list[dict[str, Any]], concurrency: int) -> dict[str, float]:
+    from app.schemas import ExtractRequest
+
+    requests_ = [ExtractRequest(**payload) for payload in payloads]
+
+    def call(req: ExtractRequest) -> float:
+        t = time.perf_counter()
+        service.extract(
+            text=req.text,
+            entities=req.entities,
+            threshold=req.threshold,
+            include_confidence=req.include_confidence,
+            include_spans=req.include_spans,
+        )
+        return time.perf_counter() - t
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        t0 = time.perf_counter()
+        latencies = list(pool.map(call, requests_))
+        elapsed = time.perf_counter() - t0
+    return summarize(latencies, elapsed)
+
+
+def measure_http(url: str, payloads: list[dict[str, Any]], concurrency: int) -> dict[str, float]:
+    import requests
+
+    local = threading.local()
+
+    def call(payload: dict[str, Any]) -> float:
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        t = time.perf_counter()
+        resp = session.post(url, json=payload, timeout=30)
+        resp.raise_for_status()
+        return time.perf_counter() - t
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        t0 = time.perf_counter()
+        latencies = list(pool.map(call, payloads))
+        elapsed = time.perf_counter() - t0
+    return summarize(latencies, elapsed)
+
+
+def start_server(app_path: str, host: str, port: int) -> subprocess.Popen:
+    import requests
+
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", app_path,
+            "--host", host, "--port", str(port),
+            "--log-level", "warning", "--no-access-log",
+        ],
+        env=os.environ.copy(),
+    )
+
+    health_url = f"http://{host}:{port}/health"
+    deadline = time.monotonic() + 60
+    while True:
+        if process.poll() is not None or time.monotonic() > deadline:
+            stop_server(process)
+            raise RuntimeError(f"No se pudo arrancar {app_path} en {host}:{port}")
+        try:
+            if requests.get(health_url, timeout=1).status_code == 200:
+                return process
+        except requests.ConnectionError:
+            pass
+        time.sleep(0.1)
+
+
+def stop_server(process: subprocess.Popen) -> None:
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def main() -> None:
+    args = parse_args()
+    if args.requests < 1 or args.concurrency < 1:
+        raise ValueError("--requests y --concurrency deben ser >= 1")
+
+    # Debe fijarse antes de importar la aplicacion, que lee la configuracion al importarse;
+    # el proceso del servidor hereda estas variables.
+    os.environ["APP_MODEL_BACKEND"] = "stub"
+    os.environ["APP_STUB_LATENCY_MS"] = str(args.stub_latency_ms)
+    os.environ["APP_STUB_PER_CHAR_US"] = str(args.stub_per_char_us)
+    os.environ["APP_STUB_CONFIDENCE"] = str(args.stub_confidence)
+    if args.stub_output_file:
+        os.environ["APP_STUB_OUTPUT_FILE"] = args.stub_output_file
+    os.environ.setdefault("APP_INFERENCE_SLOTS", str(args.concurrency))
+
+    schema = json.loads(Path(args.schema_file).read_text(encoding="utf-8"))
+    rng = random.Random(args.seed)
+    warmup = build_payloads(schema, args.warmup, args.text_words, rng)
+    payloads = build_payloads(schema, args.requests, args.text_words, rng)
+
+    module_name, _, _ = args.app.partition(":")
+    service = importlib.import_module(module_name).service
+
+    measure_direct(service, warmup, args.concurrency)
+    direct = measure_direct(service, payloads, args.concurrency)
+
+    server = start_server(args.app, args.host, args.port)
+    url = f"http://{args.host}:{args.port}/extract"
+    try:
+        measure_http(url, warmup, args.concurrency)
+        http = measure_http(url, payloads, args.concurrency)
+    finally:
+        stop_server(server)
+
+    overhead = {
+        "mean_ms": round(http["mean_ms"] - direct["mean_ms"], 3),
+        "p50_ms": round(http["p50_ms"] - direct["p50_ms"], 3),
+    }
+    summary = {
+        "app": args.app,
+        "concurrency": args.concurrency,
+        "stub_latency_ms": args.stub_latency_ms,
+        "stub_per_char_us": args.stub_per_char_us,
+        "stub_output_file": args.stub_output_file,
+        "text_words": args.text_words,
+        "direct": direct,
+        "http": http,
+        "overhead_per_request": overhead,
+    }
+
+    print("=== Prueba de carga (backend stub) ===")
+    print(f"App: {args.app} | concurrencia: {args.concurrency} | latencia stub: {args.stub_latency_ms} ms")
+    print(f"Directo: {direct['requests_per_s']:.2f} req/s | media={direct['mean_ms']:.3f} ms | p95={direct['p95_ms']:.3f} ms")
+    print(f"HTTP:    {http['requests_per_s']:.2f} req/s | media={http['mean_ms']:.3f} ms | p95={http['p95_ms']:.3f} ms")
+    print(f"Sobrecoste por peticion: media={overhead['mean_ms']:.3f} ms | p50={overhead['p50_ms']:.3f} ms")
+
+    if args.output_file:
+        Path(args.output_file).write_text(json.dumps(summary, indent=2) + "\n", encoding="utf-8")
+        print(f"Resumen guardado en {args.output_file}")
+
+
+if __name__ == "__main__":
+    main()
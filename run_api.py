@@ -1,97 +1,79 @@
 from __future__ import annotations
 
-import uvicorn
-from fastapi import FastAPI
-from gliner2 import GLiNER2
-
-from app.schemas import EntityDefinition, ExtractRequest, ExtractResponse, ExtractedEntity
+import uuid
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import Any
+
+from fastapi import FastAPI, Header, HTTPException, Response
+
+from app.backends import create_backend
+from app.concurrency import InferenceSlots
+from app.incremental import DocumentSessionStore
+from app.profiling import (
+    PROFILE_HEADER,
+    REQUEST_ID_HEADER,
+    ProfileStore,
+    ProfilingPolicy,
+    RequestProfiler,
+    is_valid_request_id,
+)
+from app.schemas import ExtractedEntity, ExtractRequest, ExtractResponse
+from app.service import GLiNER2Service
+from app.startup import StartupTimer
 from config_loader import get_config
 
 APP_TITLE = "GLiNER2 NER API"
 APP_VERSION = "1.0.0"
 
-cfg = get_config()
-
-
-class GLiNER2CompatService:
-    def __init__(self, model_name: str) -> None:
-        self.model_name = model_name
-        self._model: GLiNER2 | None = None
-
-    def _load_model(self) -> GLiNER2:
-        if self._model is None:
-            self._model = GLiNER2.from_pretrained(self.model_name)
-        return self._model
-
-    @staticmethod
-    def _build_schema(entities: list[EntityDefinition]) -> dict[str, str]:
-        return {entity.name: entity.definition for entity in entities}
-
-    def _extract_raw(
-        self,
-        text: str,
-        schema: dict[str, str],
-        threshold: float,
-        include_confidence: bool,
-        include_spans: bool,
-    ) -> dict:
-        model = self._load_model()
-        try:
-            return model.extract_entities(
-                text=text,
-                schema=schema,
-                threshold=threshold,
-                include_confidence=include_confidence,
-                include_spans=include_spans,
-            )
-        except TypeError:
-            return model.extract_entities(
-                text=text,
-                entity_types=list(schema.keys()),
-                threshold=threshold,
-                include_confidence=include_confidence,
-                include_spans=include_spans,
-            )
-
-    def extract(
-        self,
-        text: str,
-        entities: list[EntityDefinition],
-        threshold: float,
-        include_confidence: bool,
-        include_spans: bool,
-    ) -> list[ExtractedEntity]:
-        schema = self._build_schema(entities)
-        raw_entities = self._extract_raw(
-            text=text,
-            schema=schema,
-            threshold=threshold,
-            include_confidence=include_confidence,
-            include_spans=include_spans,
-        )
+# Desde el arranque del proceso: interprete e imports del modulo.
+startup = StartupTimer()
+startup.record_since_start("imports")
+
+with startup.phase("config"):
+    cfg = get_config()
+
+# Ajustes de CPU calculados por `autotune.py` (o fijados a mano en la configuracion).
+if cfg.torch_threads is not None:
+    with startup.phase("torch_import"):
+        import torch
+
+    torch.set_num_threads(cfg.torch_threads)
+inference_slots = InferenceSlots(cfg.inference_slots)
+
+profiling_policy = ProfilingPolicy(
+    sample_rate=cfg.profiling_sample_rate,
+    admin_token=cfg.profiling_admin_token,
+)
+profile_store = ProfileStore(max_entries=cfg.profiling_max_entries, directory=cfg.profiling_dir)
+
+service = GLiNER2Service(
+    model_name=cfg.model_name,
+    backend=create_backend(
+        cfg.model_backend,
+        cfg.model_name,
+        stub_latency_ms=cfg.stub_latency_ms,
+        stub_per_char_us=cfg.stub_per_char_us,
+        stub_confidence=cfg.stub_confidence,
+        stub_output_file=cfg.stub_output_file,
+    ),
+)
+document_sessions = DocumentSessionStore(service=service, max_sessions=cfg.document_sessions_max)
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI) -> AsyncIterator[None]:
+    # Cargar el modelo al arrancar (y no en la primera peticion) hace medible el
+    # arranque en frio y evita que la primera peticion de cada worker lo pague.
+    if cfg.preload_model:
+        with startup.phase("model_load"):
+            service.load_model()
+    startup.finish()
+    yield
 
-        normalized: list[ExtractedEntity] = []
-        by_label = raw_entities.get("entities", {})
-        for label, values in by_label.items():
-            for value in values:
-                if isinstance(value, dict):
-                    normalized.append(
-                        ExtractedEntity(
-                            text=value.get("text", ""),
-                            label=label,
-                            score=value.get("confidence"),
-                            start=value.get("start"),
-                            end=value.get("end"),
-                        )
-                    )
-                else:
-                    normalized.append(ExtractedEntity(text=str(value), label=label))
-        return normalized
-
-
-service = GLiNER2CompatService(model_name=cfg.model_name)
 
 app = FastAPI(
+    lifespan=lifespan,
     title=APP_TITLE,
     version=APP_VERSION,
     description=(
@@ -102,21 +84,90 @@ app = FastAPI(
 
 
 @app.get("/health")
-def health() -> dict[str, str | int]:
-    return {"status": "ok", "model": cfg.model_name, "port": cfg.port}
-
-
-@app.post("/extract", response_model=ExtractResponse)
-def extract_entities(payload: ExtractRequest) -> ExtractResponse:
-    entities = service.extract(
+def health() -> dict[str, Any]:
+    return {
+        "status": "ok",
+        "model": cfg.model_name,
+        "backend": cfg.model_backend,
+        "port": cfg.port,
+        "startup_ms": startup.phases_ms,
+    }
+
+
+def _run_extract(payload: ExtractRequest, timings: dict[str, float] | None = None) -> list[ExtractedEntity]:
+    if payload.document_id is not None:
+        return document_sessions.extract(
+            document_id=payload.document_id,
+            text=payload.text,
+            entities=payload.entities,
+            threshold=payload.threshold,
+            include_confidence=payload.include_confidence,
+            include_spans=payload.include_spans,
+            timings=timings,
+        )
+    return service.extract(
         text=payload.text,
         entities=payload.entities,
         threshold=payload.threshold,
         include_confidence=payload.include_confidence,
         include_spans=payload.include_spans,
+        timings=timings,
     )
+
+
+@app.post("/extract", response_model=ExtractResponse)
+def extract_entities(
+    payload: ExtractRequest,
+    response: Response,
+    profile_token: str | None = Header(default=None, alias=PROFILE_HEADER),
+    request_id: str | None = Header(default=None, alias=REQUEST_ID_HEADER),
+) -> ExtractResponse:
+    if not profiling_policy.should_profile(profile_token):
+        with inference_slots.shared():
+            entities = _run_extract(payload)
+        return ExtractResponse(model=cfg.model_name, entities=entities)
+
+    # Solo el administrador elige el ID (y nunca uno ya usado); si no, un cliente
+    # podria reemplazar informes ajenos.
+    is_admin = profiling_policy.is_admin(profile_token)
+    if not (is_admin and is_valid_request_id(request_id) and not profile_store.exists(request_id)):
+        request_id = uuid.uuid4().hex
+    profiler = RequestProfiler(request_id=request_id, sampled=not is_admin)
+    # torch.profiler registra operadores de todos los hilos: la peticion perfilada
+    # se ejecuta sola para que el informe no mezcle inferencias de otros clientes.
+    with inference_slots.exclusive():
+        with profiler.profile() as timings:
+            entities = _run_extract(payload, timings=timings)
+    # El cliente muestreado no recibe el ID: el informe se anuncia en el log.
+    if profiler.report is not None and profile_store.put(profiler.request_id, profiler.report) and is_admin:
+        response.headers[REQUEST_ID_HEADER] = profiler.request_id
     return ExtractResponse(model=cfg.model_name, entities=entities)
 
 
+@app.delete("/documents/{document_id}")
+def discard_document(document_id: str) -> dict[str, str | bool]:
+    return {"document_id": document_id, "discarded": document_sessions.discard(document_id)}
+
+
+@app.get("/profiles/{request_id}", include_in_schema=False)
+def get_profile(
+    request_id: str,
+    profile_token: str | None = Header(default=None, alias=PROFILE_HEADER),
+) -> dict:
+    report = profile_store.get(request_id)
+    # Los informes muestreados tienen ID aleatorio que solo aparece en el log del
+    # servidor; los pedidos con token (ID elegible) requieren el token para leerse.
+    if report is not None and (report.get("sampled") or profiling_policy.is_admin(profile_token)):
+        return report
+    if not profiling_policy.is_admin(profile_token):
+        raise HTTPException(status_code=403, detail="Token de profiling invalido")
+    raise HTTPException(status_code=404, detail=f"No hay profiling para la peticion {request_id}")
+
+
 if __name__ == "__main__":
-    uvicorn.run("run_api:app", host="0.0.0.0", port=cfg.port)
+    import uvicorn
+
+    # Con un solo worker se sirve este mismo objeto: uvicorn no reimporta el modulo
+    # y el arranque no paga dos veces imports y configuracion.
+    target = app if cfg.workers == 1 else "run_api:app"
+    uvicorn.run(target, host="0.0.0.0", port=cfg.port, workers=cfg.workers)
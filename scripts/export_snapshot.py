@@ -0,0 +1,59 @@
+"""Exporta un modelo GLiNER2 a un snapshot local para arranques rapidos.
+
+El directorio resultante contiene `config.json`, `encoder_config/`, el tokenizer
+y los pesos en `model.safetensors`. Al cargarlo con `GLiNER2.from_pretrained(<dir>)`
+no se consulta ni se descarga nada de Hugging Face; los pesos se leen del fichero
+local.
+
+Uso:
+  python scripts/export_snapshot.py --model fastino/gliner2-multi-v1 --output-dir models/gliner2-multi-v1
+  APP_MODEL_NAME=models/gliner2-multi-v1 python3 run_api.py
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from pathlib import Path
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Exporta un snapshot local de GLiNER2")
+    parser.add_argument("--model", default="fastino/gliner2-multi-v1", help="Modelo HF o ruta local")
+    parser.add_argument("--output-dir", required=True, help="Directorio de salida del snapshot")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    output_dir = Path(args.output_dir)
+
+    from gliner2 import GLiNER2
+
+    t0 = time.perf_counter()
+    model = GLiNER2.from_pretrained(args.model)
+    print(f"Modelo {args.model} cargado en {time.perf_counter() - t0:.2f}s")
+
+    model.save_pretrained(str(output_dir))
+
+    weights = output_dir / "model.safetensors"
+    if not weights.is_file():
+        raise FileNotFoundError(f"No se genero {weights}")
+
+    from safetensors import safe_open
+
+    # Comprueba que el fichero es un safetensors valido y completo.
+    with safe_open(str(weights), framework="pt", device="cpu") as handle:
+        num_tensors = len(list(handle.keys()))
+    print(
+        f"Snapshot guardado en {output_dir} "
+        f"({weights.stat().st_size / 1e6:.1f} MB de pesos, {num_tensors} tensores)"
+    )
+
+    t0 = time.perf_counter()
+    GLiNER2.from_pretrained(str(output_dir))
+    print(f"Carga desde snapshot: {time.perf_counter() - t0:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -20,9 +20,10 @@ from __future__ import annotations
 import argparse
 import json
 from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
-from gliner2 import GLiNER2
+if TYPE_CHECKING:
+    from gliner2 import GLiNER2
 
 
 def parse_args() -> argparse.Namespace:
@@ -127,7 +128,7 @@ def evaluate(model: GLiNER2, test_file: str, threshold: float, limit: int = 0) -
         expected_set = parse_expected_entities(row)
         predicted = model.extract_entities(
             text=text,
-            schema=schema,
+            entity_types=schema,
             threshold=threshold,
         )
         predicted_set = parse_predicted_entities(predicted)
@@ -155,6 +156,9 @@ def evaluate(model: GLiNER2, test_file: str, threshold: float, limit: int = 0) -
 
 def main() -> None:
     args = parse_args()
+    # Import diferido: `--help` y los errores de argumentos no cargan torch.
+    from gliner2 import GLiNER2
+
     model = GLiNER2.from_pretrained(args.model)
     evaluate(model=model, test_file=args.test_file, threshold=args.threshold, limit=args.limit)
 
@@ -17,9 +17,6 @@ from __future__ import annotations
 import argparse
 from pathlib import Path
 
-from gliner2 import GLiNER2Trainer
-from gliner2.config import TrainingConfig
-
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Entrenamiento para GLiNER2")
@@ -61,6 +58,10 @@ def main() -> None:
     train_file = ensure_file(args.train_file, "train")
     val_file = ensure_file(args.val_file, "validacion")
 
+    # Import diferido: `--help` y los errores de argumentos no cargan torch.
+    from gliner2 import GLiNER2Trainer
+    from gliner2.config import TrainingConfig
+
     config = TrainingConfig(
         num_epochs=args.num_epochs,
         train_batch_size=args.batch_size,